@@ -2,8 +2,33 @@ import logging
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
 
-from .const import DOMAIN, CONF_EMAIL, CONF_PASSWORD, CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL
-from .coordinator import FelicitySolarCoordinator
+from .const import (
+    DOMAIN,
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_UPDATE_INTERVAL,
+    DEFAULT_UPDATE_INTERVAL,
+    DATA_SCHEDULER,
+    CONF_LOGIN_TIMEOUT,
+    CONF_DEVICE_LIST_TIMEOUT,
+    CONF_SNAPSHOT_TIMEOUT,
+    DEFAULT_LOGIN_TIMEOUT,
+    DEFAULT_DEVICE_LIST_TIMEOUT,
+    DEFAULT_SNAPSHOT_TIMEOUT,
+    CONF_HEDGE_SNAPSHOTS,
+    DEFAULT_HEDGE_SNAPSHOTS,
+    CONF_CYCLE_DEADLINE,
+    DEFAULT_CYCLE_DEADLINE,
+    CONF_SESSION,
+    CONF_BANDWIDTH_SAVING,
+    DEFAULT_BANDWIDTH_SAVING,
+    CONF_DAILY_BYTE_BUDGET,
+    DEFAULT_DAILY_BYTE_BUDGET,
+    CONF_TIERED_POLLING,
+    DEFAULT_TIERED_POLLING,
+)
+from .coordinator import FelicitySolarCoordinator, bandwidth_store
+from .scheduler import FelicitySolarScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,49 +44,112 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Extract the data saved by config_flow.py
     email = entry.data[CONF_EMAIL]
     password = entry.data[CONF_PASSWORD]
-    update_interval = entry.data.get(
-        CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL)
+
+    # Polling settings come from the options flow; older entries may still carry the
+    # update interval in data
+    options = {**entry.data, **entry.options}
+    update_interval = int(options.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL))
+    timeouts = {
+        "login": options.get(CONF_LOGIN_TIMEOUT, DEFAULT_LOGIN_TIMEOUT),
+        "device_list": options.get(CONF_DEVICE_LIST_TIMEOUT, DEFAULT_DEVICE_LIST_TIMEOUT),
+        "snapshot": options.get(CONF_SNAPSHOT_TIMEOUT, DEFAULT_SNAPSHOT_TIMEOUT),
+    }
+    hedge_snapshots = options.get(CONF_HEDGE_SNAPSHOTS, DEFAULT_HEDGE_SNAPSHOTS)
+    cycle_deadline = int(options.get(CONF_CYCLE_DEADLINE, DEFAULT_CYCLE_DEADLINE))
+    bandwidth_saving = options.get(CONF_BANDWIDTH_SAVING, DEFAULT_BANDWIDTH_SAVING)
+    daily_byte_budget = int(options.get(CONF_DAILY_BYTE_BUDGET, DEFAULT_DAILY_BYTE_BUDGET))
+    tiered_polling = options.get(CONF_TIERED_POLLING, DEFAULT_TIERED_POLLING)
+
+    # One-shot handoff from the config flow: drop it from the stored entry once picked up
+    session_state = entry.data.get(CONF_SESSION)
+    if session_state is not None:
+        hass.config_entries.async_update_entry(
+            entry, data={key: value for key, value in entry.data.items() if key != CONF_SESSION}
+        )
 
     _LOGGER.info("Update interval set to %d seconds", update_interval)
+    _LOGGER.info(
+        "Request timeouts %s, cycle deadline %d seconds, hedged snapshots %s",
+        timeouts, cycle_deadline, "on" if hedge_snapshots else "off"
+    )
+    if bandwidth_saving:
+        _LOGGER.info("Bandwidth-saving mode on, daily budget %d bytes", daily_byte_budget)
+
+    # All entries share one scheduler so their requests are spread out and rate limited together
+    scheduler = hass.data[DOMAIN].get(DATA_SCHEDULER)
+    if scheduler is None:
+        scheduler = FelicitySolarScheduler(hass)
+        hass.data[DOMAIN][DATA_SCHEDULER] = scheduler
 
     # Boot up the background worker
     coordinator = FelicitySolarCoordinator(
         hass=hass,
+        entry_id=entry.entry_id,
+        scheduler=scheduler,
         email=email,
         password=password,
-        update_interval=update_interval
+        update_interval=update_interval,
+        timeouts=timeouts,
+        hedge_snapshots=hedge_snapshots,
+        cycle_deadline=cycle_deadline,
+        bandwidth_saving=bandwidth_saving,
+        daily_byte_budget=daily_byte_budget,
+        tiered_polling=tiered_polling,
+        session_state=session_state
     )
 
+    await coordinator.async_load_bandwidth()
+
     # Fetch the very first batch of data before creating the entities
     await coordinator.async_config_entry_first_refresh()
 
     # Store the coordinator in memory so sensor.py can access it
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    scheduler.async_register(entry.entry_id, coordinator)
 
     _LOGGER.info(
         "First refresh complete, found %d device(s), forwarding setup to sensor platform",
         len(coordinator.data) if coordinator.data else 0
     )
 
+    # Reload with the new settings whenever the options are changed
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     # Forward setup to sensor.py
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     _LOGGER.info("Felicity Solar integration setup complete")
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry (e.g. if the user clicks Delete)."""
     _LOGGER.info("Unloading Felicity Solar integration for %s", entry.data.get(CONF_EMAIL, "unknown"))
 
-    coordinator = hass.data[DOMAIN].get(entry.entry_id)
-    if coordinator and hasattr(coordinator, "_session"):
-        await coordinator._session.close()
-        _LOGGER.debug("Closed custom aiohttp session")
-
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        # Only stop polling once the platforms are gone, a failed unload leaves the entry running
+        scheduler = hass.data[DOMAIN].get(DATA_SCHEDULER)
+        if scheduler:
+            scheduler.async_unregister(entry.entry_id)
+            if scheduler.is_empty:
+                hass.data[DOMAIN].pop(DATA_SCHEDULER)
+
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_save_bandwidth()
+        if coordinator and hasattr(coordinator, "_session"):
+            await coordinator._session.close()
+            _LOGGER.debug("Closed custom aiohttp session")
         _LOGGER.info("Felicity Solar integration unloaded successfully")
     else:
         _LOGGER.warning("Failed to unload Felicity Solar integration")
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Clean up stored data when a config entry is deleted."""
+    await bandwidth_store(hass, entry.entry_id).async_remove()
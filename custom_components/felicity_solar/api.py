@@ -3,7 +3,11 @@ import re
 import json
 import base64
 import os
+import math
+import tempfile
 import asyncio
+from collections import deque
+from typing import Callable
 from urllib.parse import urljoin
 from datetime import datetime
 from enum import Enum
@@ -12,8 +16,34 @@ from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_v1_5
 import aiohttp
 
+from .const import DEFAULT_LOGIN_TIMEOUT, DEFAULT_DEVICE_LIST_TIMEOUT, DEFAULT_SNAPSHOT_TIMEOUT
+
 _LOGGER = logging.getLogger(__name__)
 
+# Deadlines per endpoint group; "login" also covers scraping the public key
+DEFAULT_TIMEOUTS = {
+    "login": DEFAULT_LOGIN_TIMEOUT,
+    "device_list": DEFAULT_DEVICE_LIST_TIMEOUT,
+    "snapshot": DEFAULT_SNAPSHOT_TIMEOUT,
+}
+
+# The token file is shared by every account in the process, so reads and
+# read-modify-write updates of it are serialized
+_TOKEN_FILE_LOCK = asyncio.Lock()
+
+# Device list status values for devices that aren't reporting. These are a best guess,
+# every other value counts as online; new values are logged once at debug level so
+# they can be checked against what the cloud actually sends
+OFFLINE_DEVICE_STATUSES = {"OFFLINE", "OFF_LINE", "DISCONNECTED"}
+
+# Rough size of the headers aiohttp adds to every request (Host, User-Agent,
+# Accept-Encoding, Content-Length...), for requests cancelled before we saw them
+REQUEST_DEFAULT_HEADERS_BYTES = 150
+
+# Hedging needs enough latency samples for the p95 to mean something
+SNAPSHOT_LATENCY_WINDOW = 100
+SNAPSHOT_HEDGE_MIN_SAMPLES = 20
+
 
 def create_felicity_client_session(hass=None) -> aiohttp.ClientSession:
     """Create an aiohttp ClientSession with SSL verification disabled.
@@ -33,6 +63,86 @@ class DeviceTypeEnum(str, Enum):
     HIGH_FREQUENCY_INVERTER = "HIGH_FREQUENCY_INVERTER"
 
 
+def _safe_float(value, default=0.0):
+    """Convert value to float, returning default if value is None or invalid."""
+    try:
+        return float(value) if value is not None else default
+    except (ValueError, TypeError):
+        return default
+
+
+def _safe_int(value, default=0):
+    """Convert value to int, returning default if value is None or invalid."""
+    try:
+        return int(value) if value is not None else default
+    except (ValueError, TypeError):
+        return default
+
+
+def is_device_online(record: dict) -> bool:
+    """Read the status of a device list entry; anything not known to be offline counts as online."""
+    return str(record.get("status", "")).upper() not in OFFLINE_DEVICE_STATUSES
+
+
+def device_record_fingerprint(record: dict) -> str:
+    """Summarize a device list entry so changes between two device lists can be detected."""
+    return json.dumps(record, sort_keys=True, default=str)
+
+
+def normalize_device_snapshot(device_sn: str, snapshot: dict) -> dict | None:
+    """Map a raw snapshot onto the normalized fields exposed by the integration.
+
+    Returns None for device types we don't know how to read.
+    """
+    device_type = snapshot.get("productTypeEnum")
+
+    if device_type == DeviceTypeEnum.HIGH_FREQUENCY_INVERTER:
+        return {
+            "type": device_type,
+            "serialNumber": device_sn,
+            "data": {
+                "acInputVoltage": _safe_float(snapshot.get("acRInVolt")),
+                "acInputFrequency": _safe_float(snapshot.get("acRInFreq")),
+                "acInputPower": _safe_float(snapshot.get("acRInPower")),
+                "acOutputVoltage": _safe_float(snapshot.get("acROutVolt")),
+                "acOutputCurrent": _safe_float(snapshot.get("acROutCurr")),
+                "acOutputFrequency": _safe_float(snapshot.get("acROutFreq")),
+                "acTotalOutputActivePower": _safe_float(snapshot.get("acTotalOutActPower")),
+                "loadPercentage": _safe_float(snapshot.get("loadPercent")),
+                "pvVoltage": _safe_float(snapshot.get("pvVolt")),
+                "pvInputCurrent": _safe_float(snapshot.get("pvInCurr")),
+                "pvPower": _safe_float(snapshot.get("pvPower")),
+                "pvTotalPower": _safe_float(snapshot.get("pvTotalPower")),
+                "batteryVoltage": _safe_float(snapshot.get("emsVoltage")),
+                "batteryCurrent": _safe_float(snapshot.get("emsCurrent")),
+                "batteryPower": _safe_float(snapshot.get("emsPower")),
+                "batterySoc": _safe_int(snapshot.get("emsSoc")),
+                "tempMax": _safe_float(snapshot.get("tempMax")),
+                "devTempMax": _safe_float(snapshot.get("devTempMax")),
+                "energyPvToday": _safe_float(snapshot.get("ePvToday")),
+                "energyPvTotal": _safe_float(snapshot.get("ePvTotal")),
+                "energyLoadToday": _safe_float(snapshot.get("eLoadToday")),
+                "energyLoadTotal": _safe_float(snapshot.get("eLoadTotal")),
+                "totalEnergy": _safe_float(snapshot.get("totalEnergy")),
+            }
+        }
+    if device_type == DeviceTypeEnum.LITHIUM_BATTERY_PACK:
+        return {
+            "type": device_type,
+            "serialNumber": device_sn,
+            "data": {
+                "voltage": _safe_float(snapshot.get("battVolt")),
+                "current": _safe_float(snapshot.get("battCurr")),
+                "soc": _safe_int(snapshot.get("battSoc")),
+                "soh": _safe_int(snapshot.get("battSoh")),
+                "ratedEnergy": _safe_float(snapshot.get("ratedEnergy")),
+                "energyUnit": str(snapshot.get("energyUnit", "")),
+                "nameplateRatedPower": str(snapshot.get("nameplateRatedPower", "")),
+            }
+        }
+    return None
+
+
 class FelicitySolarAPI:
     JSON_FILE_PATH = "data/felicitySolarToken.json"
     LOGIN_URL = "https://shine.felicitysolar.com/login"
@@ -40,14 +150,26 @@ class FelicitySolarAPI:
     API_URL_DEVICE_SNAPSHOT = "https://shine-api.felicitysolar.com/device/get_device_snapshot"
     API_URL_USER_LOGIN = "https://shine-api.felicitysolar.com/userlogin"
 
-    def __init__(self, email: str, password: str, session: aiohttp.ClientSession):
+    def __init__(self, email: str, password: str, session: aiohttp.ClientSession,
+                 timeouts: dict[str, float] | None = None, hedge_snapshots: bool = False):
         self.email = email
         self.password = password
         self.session = session
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.hedge_snapshots = hedge_snapshots
+        self._snapshot_latencies: deque[float] = deque(maxlen=SNAPSHOT_LATENCY_WINDOW)
+        # Approximate bytes on the wire (headers and bodies), in total and per endpoint group
+        self.bytes_used = 0
+        self.bytes_by_endpoint: dict[str, int] = {endpoint: 0 for endpoint in DEFAULT_TIMEOUTS}
 
         self.bearer_token: str | None = None
         self.token_expiration: datetime | None = None
         self.devices_serial_numbers: list[str] = []
+        # Full device list entries (status and summary fields), keyed by serial number
+        self.device_records: dict[str, dict] = {}
+        self._seen_device_statuses: set[str] = set()
+        # Scraping the key means downloading the login page and JS bundles, so keep it around
+        self.public_key: str | None = None
 
     async def initialize(self) -> None:
         _LOGGER.info("Initializing Felicity Solar API for %s", self.email)
@@ -75,6 +197,11 @@ class FelicitySolarAPI:
             self.devices_serial_numbers
         )
 
+    async def ensure_logged_in(self) -> None:
+        if not self._is_logged_in():
+            _LOGGER.info("Token expired or missing, re-authenticating")
+            await self._login()
+
     async def refresh_devices(self) -> None:
         _LOGGER.info("Refreshing device list for %s", self.email)
         if not self._is_logged_in():
@@ -86,11 +213,95 @@ class FelicitySolarAPI:
     def get_devices_serial_numbers(self) -> list[str]:
         return self.devices_serial_numbers
 
-    async def get_device_snapshot(self, device_sn: str) -> dict:
+    def get_device_record(self, device_sn: str) -> dict | None:
+        return self.device_records.get(device_sn)
+
+    def has_valid_session(self) -> bool:
+        """Whether we hold a valid token and a device list, i.e. can go straight to snapshots."""
+        return self._is_logged_in() and bool(self.devices_serial_numbers)
+
+    def export_session(self) -> dict:
+        """Return the login state as JSON-serializable data, to be handed to restore_session()."""
+        return {
+            "bearer": self.bearer_token,
+            "exp": int(self.token_expiration.timestamp() * 1000) if self.token_expiration else None,
+            "public_key": self.public_key,
+            "devices": list(self.devices_serial_numbers),
+        }
+
+    def restore_session(self, state: dict) -> None:
+        self.bearer_token = state.get("bearer")
+        exp = state.get("exp")
+        self.token_expiration = datetime.fromtimestamp(exp / 1000) if exp else None
+        self.public_key = state.get("public_key")
+        self.devices_serial_numbers = list(state.get("devices") or [])
+        _LOGGER.info(
+            "Restored session for %s with %d device(s)",
+            self.email, len(self.devices_serial_numbers)
+        )
+
+    async def get_device_snapshot(self, device_sn: str,
+                                  try_acquire_hedge_slot: Callable[[], Callable[[], None] | None] | None = None) -> dict:
+        """Fetch a device snapshot, hedging it when enabled.
+
+        try_acquire_hedge_slot lets the caller account for the duplicate request: it
+        returns a release callback, or None when no slot is free and we shouldn't hedge.
+        """
         if not self._is_logged_in():
             _LOGGER.warning("Token expired before snapshot request for %s, re-authenticating", device_sn)
             await self._login()
 
+        hedge_delay = self._snapshot_hedge_delay()
+        if hedge_delay is None:
+            return await self._fetch_device_snapshot(device_sn)
+
+        # Hedged request: if the first attempt is slower than the p95, race a duplicate
+        # against it and keep whichever answers first
+        tasks = [asyncio.create_task(self._fetch_device_snapshot(device_sn))]
+        release_hedge_slot = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                if try_acquire_hedge_slot is not None:
+                    release_hedge_slot = try_acquire_hedge_slot()
+                if try_acquire_hedge_slot is None or release_hedge_slot is not None:
+                    _LOGGER.debug(
+                        "Snapshot for %s slower than p95 (%.2fs), sending hedged request",
+                        device_sn, hedge_delay
+                    )
+                    tasks.append(asyncio.create_task(self._fetch_device_snapshot(device_sn)))
+                else:
+                    _LOGGER.debug("Snapshot for %s slower than p95 but no request slot free, not hedging", device_sn)
+
+            pending = set(tasks)
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if release_hedge_slot is not None:
+                release_hedge_slot()
+
+    # --- Private Methods ---
+
+    def _timeout(self, endpoint: str) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=self.timeouts[endpoint])
+
+    def _snapshot_hedge_delay(self) -> float | None:
+        """Return the observed p95 snapshot latency, or None if hedging is off or not warmed up."""
+        if not self.hedge_snapshots or len(self._snapshot_latencies) < SNAPSHOT_HEDGE_MIN_SAMPLES:
+            return None
+        latencies = sorted(self._snapshot_latencies)
+        return latencies[math.ceil(len(latencies) * 0.95) - 1]
+
+    async def _fetch_device_snapshot(self, device_sn: str) -> dict:
         _LOGGER.debug("Fetching snapshot for device %s", device_sn)
         today_date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         headers = {
@@ -104,26 +315,66 @@ class FelicitySolarAPI:
             "dateStr": today_date_str
         }
 
-        async with self.session.post(self.API_URL_DEVICE_SNAPSHOT, headers=headers, json=payload) as response:
-            response.raise_for_status()
-            data = await response.json()
+        started = asyncio.get_running_loop().time()
+        counted = False
+        try:
+            async with self.session.post(self.API_URL_DEVICE_SNAPSHOT, headers=headers, json=payload,
+                                         timeout=self._timeout("snapshot")) as response:
+                await self._count_transfer("snapshot", response, payload)
+                counted = True
+                response.raise_for_status()
+                data = await response.json()
+        except asyncio.CancelledError:
+            # A cancelled hedge (or deadline miss) has still sent its request
+            if not counted:
+                self._add_bytes("snapshot", self._estimate_request_bytes(headers, payload))
+            raise
+        self._snapshot_latencies.append(asyncio.get_running_loop().time() - started)
+
+        if "data" not in data:
+            _LOGGER.error("Snapshot response missing 'data' field for %s: %s", device_sn, data)
+            raise ValueError(f"Failed to get device snapshot: {data}")
+
+        device_data = data["data"]
+        if "productTypeEnum" not in device_data:
+            _LOGGER.error("Snapshot response missing 'productTypeEnum' for %s: %s", device_sn, device_data)
+            raise ValueError(f"Invalid device data: {device_data}")
 
-            if "data" not in data:
-                _LOGGER.error("Snapshot response missing 'data' field for %s: %s", device_sn, data)
-                raise ValueError(f"Failed to get device snapshot: {data}")
+        _LOGGER.info(
+            "Snapshot received for %s (type=%s)",
+            device_sn, device_data.get("productTypeEnum", "unknown")
+        )
+        return device_data
 
-            device_data = data["data"]
-            if "productTypeEnum" not in device_data:
-                _LOGGER.error("Snapshot response missing 'productTypeEnum' for %s: %s", device_sn, device_data)
-                raise ValueError(f"Invalid device data: {device_data}")
+    def _add_bytes(self, endpoint: str, count: int) -> None:
+        self.bytes_used += count
+        self.bytes_by_endpoint[endpoint] += count
 
-            _LOGGER.info(
-                "Snapshot received for %s (type=%s)",
-                device_sn, device_data.get("productTypeEnum", "unknown")
-            )
-            return device_data
+    def _estimate_request_bytes(self, headers: dict, payload: dict | None) -> int:
+        header_bytes = sum(len(name) + len(str(value)) + 4 for name, value in headers.items())
+        body_bytes = len(json.dumps(payload)) if payload is not None else 0
+        return REQUEST_DEFAULT_HEADERS_BYTES + header_bytes + body_bytes
 
-    # --- Private Methods ---
+    async def _count_transfer(self, endpoint: str, response: aiohttp.ClientResponse,
+                              payload: dict | None = None) -> None:
+        """Read the response body and add the approximate size of the exchange to bytes_used.
+
+        Called before raise_for_status() so error responses are counted too. Includes the
+        request line, both header blocks and both bodies, but not TLS/TCP overhead.
+        """
+        body = await response.read()
+
+        request_info = response.request_info
+        sent = len(request_info.method) + len(str(request_info.url)) + len(" HTTP/1.1\r\n")
+        sent += sum(len(name) + len(value) + 4 for name, value in request_info.headers.items()) + 2
+        sent += len(json.dumps(payload)) if payload is not None else 0
+
+        received = len("HTTP/1.1 000 \r\n") + len(response.reason or "")
+        received += sum(len(name) + len(value) + 4 for name, value in response.raw_headers) + 2
+        # Content-Length is the size on the wire (compressed); fall back to the decoded size
+        received += response.content_length if response.content_length is not None else len(body)
+
+        self._add_bytes(endpoint, sent + received)
 
     def _is_logged_in(self) -> bool:
         if not self.bearer_token or not self.token_expiration:
@@ -149,12 +400,21 @@ class FelicitySolarAPI:
             return None
 
     def _write_token_file_sync(self, data):
-        os.makedirs(os.path.dirname(self.JSON_FILE_PATH) or ".", exist_ok=True)
-        with open(self.JSON_FILE_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        directory = os.path.dirname(self.JSON_FILE_PATH) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and swap it in, so readers never see a truncated file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.JSON_FILE_PATH)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
 
     async def _load_from_file(self) -> None:
-        data = await asyncio.to_thread(self._read_token_file_sync)
+        async with _TOKEN_FILE_LOCK:
+            data = await asyncio.to_thread(self._read_token_file_sync)
         if not data:
             _LOGGER.info("No token file found at %s", self.JSON_FILE_PATH)
             return
@@ -172,6 +432,10 @@ class FelicitySolarAPI:
         if not self.bearer_token or not self.token_expiration:
             return
 
+        async with _TOKEN_FILE_LOCK:
+            await self._save_to_file_locked()
+
+    async def _save_to_file_locked(self) -> None:
         data = await asyncio.to_thread(self._read_token_file_sync) or []
 
         found = next(
@@ -212,7 +476,9 @@ class FelicitySolarAPI:
             "oscFlag": ""
         }
 
-        async with self.session.post(self.API_URL_DEVICE_LIST, headers=headers, json=payload) as response:
+        async with self.session.post(self.API_URL_DEVICE_LIST, headers=headers, json=payload,
+                                     timeout=self._timeout("device_list")) as response:
+            await self._count_transfer("device_list", response, payload)
             response.raise_for_status()
             data = await response.json()
             data_list = data.get("data", {}).get("dataList", [])
@@ -222,8 +488,30 @@ class FelicitySolarAPI:
                 len(devices_sn), devices_sn
             )
             self.devices_serial_numbers = devices_sn
+            self.device_records = {device["deviceSn"]: device for device in data_list}
+
+            for device in data_list:
+                status = str(device.get("status", ""))
+                if status not in self._seen_device_statuses:
+                    self._seen_device_statuses.add(status)
+                    _LOGGER.debug(
+                        "First device list status %r (device %s), treated as %s",
+                        status, device["deviceSn"], "online" if is_device_online(device) else "offline"
+                    )
 
     async def _login(self) -> None:
+        used_cached_key = self.public_key is not None
+        try:
+            await self._login_request()
+        except (ValueError, aiohttp.ClientResponseError) as err:
+            if not used_cached_key:
+                raise
+            # The site may have rotated its key since we scraped it, try once with a fresh one
+            _LOGGER.warning("Login failed with the cached public key (%s), extracting it again", err)
+            self.public_key = None
+            await self._login_request()
+
+    async def _login_request(self) -> None:
         _LOGGER.info("Logging in to Felicity Solar as %s", self.email)
         password_hash = await self._generate_password_hash(self.password)
         headers = {
@@ -236,7 +524,9 @@ class FelicitySolarAPI:
             "version": "1.0"
         }
 
-        async with self.session.post(self.API_URL_USER_LOGIN, headers=headers, json=payload) as response:
+        async with self.session.post(self.API_URL_USER_LOGIN, headers=headers, json=payload,
+                                     timeout=self._timeout("login")) as response:
+            await self._count_transfer("login", response, payload)
             response.raise_for_status()
             data = await response.json()
             bearer = data.get("data", {}).get("token")
@@ -264,15 +554,17 @@ class FelicitySolarAPI:
             await self._save_to_file()
 
     async def _generate_password_hash(self, password: str) -> str:
-        public_key_str = await self._extract_public_key()
-        key = RSA.import_key(public_key_str)
+        if self.public_key is None:
+            self.public_key = await self._extract_public_key()
+        key = RSA.import_key(self.public_key)
         cipher = PKCS1_v1_5.new(key)
         encrypted = cipher.encrypt(password.encode("utf-8"))
         return base64.b64encode(encrypted).decode("utf-8")
 
     async def _extract_public_key(self) -> str:
         _LOGGER.info("Extracting RSA public key from Felicity Solar login page")
-        async with self.session.get(self.LOGIN_URL) as response:
+        async with self.session.get(self.LOGIN_URL, timeout=self._timeout("login")) as response:
+            await self._count_transfer("login", response)
             response.raise_for_status()
             combined_text = await response.text()
 
@@ -292,7 +584,8 @@ class FelicitySolarAPI:
             _LOGGER.info("Found main JS bundle: %s", index_url)
             try:
                 absolute_index_url = urljoin(self.LOGIN_URL, index_url)
-                async with self.session.get(absolute_index_url) as index_res:
+                async with self.session.get(absolute_index_url, timeout=self._timeout("login")) as index_res:
+                    await self._count_transfer("login", index_res)
                     if index_res.status == 200:
                         index_text = await index_res.text()
                         combined_text += "\n\n" + index_text
@@ -317,7 +610,8 @@ class FelicitySolarAPI:
         for src in script_urls:
             absolute_url = urljoin(self.LOGIN_URL, src)
             try:
-                async with self.session.get(absolute_url) as script_res:
+                async with self.session.get(absolute_url, timeout=self._timeout("login")) as script_res:
+                    await self._count_transfer("login", script_res)
                     if script_res.status == 200:
                         script_text = await script_res.text()
                         combined_text += "\n\n" + script_text
@@ -0,0 +1,228 @@
+"""Standalone collector and Prometheus exporter for Felicity Solar.
+
+Runs FelicitySolarAPI outside Home Assistant: polls any number of accounts with a
+global limit on in-flight requests and serves the latest normalized inverter and
+battery fields on /metrics. Scrapes are answered from the cache, so Prometheus can
+scrape as often as it likes without adding load on the Felicity Solar cloud.
+
+Usage (from the repository root, see felicity_solar_collector.py):
+    python felicity_solar_collector.py --config accounts.json
+
+where accounts.json is a list of {"email": ..., "password": ...} objects.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+
+import aiohttp
+from aiohttp import web
+
+from .api import FelicitySolarAPI, create_felicity_client_session, normalize_device_snapshot
+from .const import DEFAULT_UPDATE_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 9735
+DEFAULT_MAX_IN_FLIGHT = 4
+METRIC_PREFIX = "felicity_solar"
+
+
+def _metric_name(field: str) -> str:
+    """Convert a camelCase field name (e.g. acInputVoltage) to a Prometheus metric name."""
+    snake = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", field).lower()
+    return f"{METRIC_PREFIX}_{snake}"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    return ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+
+
+class AccountCollector:
+    """Polling state and cached results for a single Felicity Solar account."""
+
+    def __init__(self, email: str, password: str, session: aiohttp.ClientSession):
+        self.email = email
+        self.api = FelicitySolarAPI(email=email, password=password, session=session)
+
+        self.devices: dict[str, dict] = {}
+        self.up = False
+        self.last_success: float | None = None
+        self.last_duration: float | None = None
+
+
+class FelicitySolarCollector:
+    """Polls many accounts in the background and renders the cached data as metrics."""
+
+    def __init__(self, accounts: list[dict], update_interval: int = DEFAULT_UPDATE_INTERVAL,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.update_interval = update_interval
+        self._session = create_felicity_client_session()
+        # Shared by every account so the number of concurrent cloud requests stays
+        # bounded no matter how many sites are configured
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.accounts = [
+            AccountCollector(account["email"], account["password"], self._session)
+            for account in accounts
+        ]
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        _LOGGER.info(
+            "Starting collector for %d account(s), interval %ds",
+            len(self.accounts), self.update_interval
+        )
+        for index, account in enumerate(self.accounts):
+            # Spread the accounts evenly over the interval instead of polling all at once
+            offset = self.update_interval * index / len(self.accounts)
+            self._tasks.append(asyncio.create_task(self._poll_loop(account, offset)))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self._session.close()
+
+    async def _poll_loop(self, account: AccountCollector, offset: float) -> None:
+        await asyncio.sleep(offset)
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        while True:
+            await self._poll_account(account)
+            next_run += self.update_interval
+            # After a slow poll, skip the missed ticks rather than replaying them back-to-back
+            if next_run <= loop.time():
+                next_run = loop.time() + self.update_interval
+            await asyncio.sleep(next_run - loop.time())
+
+    async def _poll_account(self, account: AccountCollector) -> None:
+        started = time.monotonic()
+        try:
+            async with self._semaphore:
+                await account.api.initialize()
+
+            serial_numbers = account.api.get_devices_serial_numbers()
+            results = await asyncio.gather(
+                *(self._fetch_device(account, device_sn) for device_sn in serial_numbers)
+            )
+            account.devices = {
+                entry["serialNumber"]: entry for entry in results if entry is not None
+            }
+            account.up = True
+            account.last_success = time.time()
+            _LOGGER.info(
+                "Polled %s: %d device(s) with data out of %d",
+                account.email, len(account.devices), len(serial_numbers)
+            )
+        except Exception as err:
+            # Keep serving the previous data, flagged through felicity_solar_account_up
+            account.up = False
+            _LOGGER.error("Polling failed for %s: %s", account.email, err)
+        finally:
+            account.last_duration = time.monotonic() - started
+
+    async def _fetch_device(self, account: AccountCollector, device_sn: str) -> dict | None:
+        try:
+            async with self._semaphore:
+                snapshot = await account.api.get_device_snapshot(device_sn)
+        except Exception as err:
+            _LOGGER.error("Failed to fetch snapshot for device %s: %s", device_sn, err)
+            return None
+
+        device_entry = normalize_device_snapshot(device_sn, snapshot)
+        if device_entry is None:
+            _LOGGER.warning(
+                "Unknown device type '%s' for %s, skipping",
+                snapshot.get("productTypeEnum"), device_sn
+            )
+        return device_entry
+
+    def render_metrics(self) -> str:
+        """Render the cached data in the Prometheus text exposition format."""
+        samples: dict[str, list[str]] = {}
+
+        def add(name: str, labels: dict, value) -> None:
+            samples.setdefault(name, []).append(f"{name}{{{_format_labels(labels)}}} {value}")
+
+        for account in self.accounts:
+            account_labels = {"account": account.email}
+            add(f"{METRIC_PREFIX}_account_up", account_labels, int(account.up))
+            if account.last_success is not None:
+                add(f"{METRIC_PREFIX}_account_last_success_timestamp_seconds",
+                    account_labels, account.last_success)
+            if account.last_duration is not None:
+                add(f"{METRIC_PREFIX}_account_poll_duration_seconds",
+                    account_labels, account.last_duration)
+
+            for device_sn, device_entry in account.devices.items():
+                labels = {
+                    "account": account.email,
+                    "device_sn": device_sn,
+                    "device_type": device_entry["type"],
+                }
+                for field, value in device_entry["data"].items():
+                    # Text fields such as energyUnit are not representable as gauges
+                    if isinstance(value, (int, float)):
+                        add(_metric_name(field), labels, value)
+
+        lines = []
+        for name, metric_samples in samples.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(metric_samples)
+        return "\n".join(lines) + "\n"
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.render_metrics().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+
+async def run(accounts: list[dict], host: str, port: int, update_interval: int, max_in_flight: int) -> None:
+    collector = FelicitySolarCollector(accounts, update_interval, max_in_flight)
+    app = web.Application()
+    app.router.add_get("/metrics", collector.handle_metrics)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    _LOGGER.info("Serving metrics on http://%s:%d/metrics", host, port)
+
+    collector.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await collector.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Felicity Solar collector and Prometheus exporter")
+    parser.add_argument("--config", required=True,
+                        help="JSON file with a list of {\"email\", \"password\"} accounts")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--interval", type=int, default=DEFAULT_UPDATE_INTERVAL,
+                        help="Seconds between polls of each account")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="Maximum concurrent requests across all accounts")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        accounts = json.load(f)
+
+    try:
+        asyncio.run(run(accounts, args.host, args.port, args.interval, args.max_in_flight))
+    except KeyboardInterrupt:
+        pass
+
@@ -1,9 +1,33 @@
 import logging
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.helpers import selector
 
-from .const import DOMAIN, CONF_EMAIL, CONF_PASSWORD
+from .const import (
+    DOMAIN,
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_SESSION,
+    CONF_UPDATE_INTERVAL,
+    DEFAULT_UPDATE_INTERVAL,
+    CONF_LOGIN_TIMEOUT,
+    CONF_DEVICE_LIST_TIMEOUT,
+    CONF_SNAPSHOT_TIMEOUT,
+    DEFAULT_LOGIN_TIMEOUT,
+    DEFAULT_DEVICE_LIST_TIMEOUT,
+    DEFAULT_SNAPSHOT_TIMEOUT,
+    CONF_HEDGE_SNAPSHOTS,
+    DEFAULT_HEDGE_SNAPSHOTS,
+    CONF_CYCLE_DEADLINE,
+    DEFAULT_CYCLE_DEADLINE,
+    CONF_BANDWIDTH_SAVING,
+    DEFAULT_BANDWIDTH_SAVING,
+    CONF_DAILY_BYTE_BUDGET,
+    DEFAULT_DAILY_BYTE_BUDGET,
+    CONF_TIERED_POLLING,
+    DEFAULT_TIERED_POLLING,
+)
 from .api import FelicitySolarAPI, create_felicity_client_session
 
 _LOGGER = logging.getLogger(__name__)
@@ -18,10 +42,38 @@ DATA_SCHEMA = vol.Schema({
 })
 
 
+def _seconds_selector(minimum: int, maximum: int) -> selector.NumberSelector:
+    return selector.NumberSelector(
+        selector.NumberSelectorConfig(min=minimum, max=maximum, step=1, unit_of_measurement="s",
+                                      mode=selector.NumberSelectorMode.BOX)
+    )
+
+
+OPTIONS_SCHEMA = vol.Schema({
+    vol.Required(CONF_UPDATE_INTERVAL, default=DEFAULT_UPDATE_INTERVAL): _seconds_selector(10, 3600),
+    vol.Required(CONF_LOGIN_TIMEOUT, default=DEFAULT_LOGIN_TIMEOUT): _seconds_selector(1, 120),
+    vol.Required(CONF_DEVICE_LIST_TIMEOUT, default=DEFAULT_DEVICE_LIST_TIMEOUT): _seconds_selector(1, 120),
+    vol.Required(CONF_SNAPSHOT_TIMEOUT, default=DEFAULT_SNAPSHOT_TIMEOUT): _seconds_selector(1, 120),
+    vol.Required(CONF_CYCLE_DEADLINE, default=DEFAULT_CYCLE_DEADLINE): _seconds_selector(1, 3600),
+    vol.Required(CONF_HEDGE_SNAPSHOTS, default=DEFAULT_HEDGE_SNAPSHOTS): selector.BooleanSelector(),
+    vol.Required(CONF_TIERED_POLLING, default=DEFAULT_TIERED_POLLING): selector.BooleanSelector(),
+    vol.Required(CONF_BANDWIDTH_SAVING, default=DEFAULT_BANDWIDTH_SAVING): selector.BooleanSelector(),
+    vol.Required(CONF_DAILY_BYTE_BUDGET, default=DEFAULT_DAILY_BYTE_BUDGET): selector.NumberSelector(
+        selector.NumberSelectorConfig(min=0, step=1, unit_of_measurement="B",
+                                      mode=selector.NumberSelectorMode.BOX)
+    ),
+})
+
+
 class FelicitySolarConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Felicity Solar."""
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return FelicitySolarOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         """Handle the initial setup step."""
         errors = {}
@@ -30,24 +82,26 @@ class FelicitySolarConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             email = user_input[CONF_EMAIL]
             password = user_input[CONF_PASSWORD]
 
+            # Create a session with custom SSL handling for Felicity Solar
+            session = create_felicity_client_session(self.hass)
             try:
-                # Create a session with custom SSL handling for Felicity Solar
-                session = create_felicity_client_session(self.hass)
-
                 # Initialize the API to test credentials
                 api = FelicitySolarAPI(email, password, session)
 
                 # If initialize() passes without throwing an error, credentials are valid!
                 await api.initialize()
 
+                # Hand the token, key and device list over so the first refresh doesn't redo the login
                 return self.async_create_entry(
                     title=email,
-                    data=user_input
+                    data={**user_input, CONF_SESSION: api.export_session()}
                 )
             except Exception as err:
                 _LOGGER.error(
                     f"Failed to authenticate with Felicity Solar: {err}")
                 errors["base"] = "invalid_auth"
+            finally:
+                await session.close()
 
         # Show the form (with red errors if authentication failed)
         return self.async_show_form(
@@ -55,3 +109,18 @@ class FelicitySolarConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=DATA_SCHEMA,
             errors=errors
         )
+
+
+class FelicitySolarOptionsFlow(config_entries.OptionsFlow):
+    """Handle polling options for Felicity Solar; saving them reloads the entry."""
+
+    async def async_step_init(self, user_input=None):
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        # Entries created before the options flow may carry the update interval in data
+        current = {**self.config_entry.data, **self.config_entry.options}
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(OPTIONS_SCHEMA, current)
+        )
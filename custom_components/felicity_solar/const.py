@@ -3,3 +3,47 @@ CONF_EMAIL = "email"
 CONF_PASSWORD = "password"
 CONF_UPDATE_INTERVAL = "update_interval"
 DEFAULT_UPDATE_INTERVAL = 30
+
+# Shared scheduler stored in hass.data[DOMAIN] next to the per-entry coordinators
+DATA_SCHEDULER = "scheduler"
+SCHEDULER_MAX_IN_FLIGHT = 4
+
+# Per-endpoint request deadlines, in seconds
+CONF_LOGIN_TIMEOUT = "login_timeout"
+CONF_DEVICE_LIST_TIMEOUT = "device_list_timeout"
+CONF_SNAPSHOT_TIMEOUT = "snapshot_timeout"
+DEFAULT_LOGIN_TIMEOUT = 20
+DEFAULT_DEVICE_LIST_TIMEOUT = 15
+DEFAULT_SNAPSHOT_TIMEOUT = 10
+
+# Send a duplicate snapshot request once the first one is slower than the observed p95
+CONF_HEDGE_SNAPSHOTS = "hedge_snapshots"
+DEFAULT_HEDGE_SNAPSHOTS = False
+
+# Devices still pending when the cycle deadline hits keep their previous values
+CONF_CYCLE_DEADLINE = "cycle_deadline"
+DEFAULT_CYCLE_DEADLINE = 25
+
+# Login state validated by the config flow, consumed by the first refresh
+CONF_SESSION = "session"
+
+# Bandwidth-saving mode for metered connections: rediscover devices only every
+# DEVICE_DISCOVERY_INTERVAL seconds and stretch the update interval to fit the daily budget
+CONF_BANDWIDTH_SAVING = "bandwidth_saving"
+DEFAULT_BANDWIDTH_SAVING = False
+CONF_DAILY_BYTE_BUDGET = "daily_byte_budget"
+DEFAULT_DAILY_BYTE_BUDGET = 10 * 1024 * 1024
+DEVICE_DISCOVERY_INTERVAL = 6 * 60 * 60
+MAX_BUDGET_UPDATE_INTERVAL = 60 * 60
+# Share of the budget that pacing leaves free for logins and rediscovery; once the
+# whole budget is spent, polling stops until midnight
+BUDGET_ONE_OFF_RESERVE = 0.1
+
+# Today's byte count is persisted so the budget holds across restarts and reloads
+BANDWIDTH_STORAGE_VERSION = 1
+BANDWIDTH_SAVE_DELAY = 60
+
+# Use the device list as a cheap first pass and only snapshot devices that are online
+# or whose list entry changed since their last snapshot
+CONF_TIERED_POLLING = "tiered_polling"
+DEFAULT_TIERED_POLLING = False
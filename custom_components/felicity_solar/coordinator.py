@@ -1,54 +1,109 @@
+import asyncio
 import logging
 from datetime import timedelta
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 
-from .api import FelicitySolarAPI, DeviceTypeEnum, create_felicity_client_session
-from .const import DOMAIN
+from .api import (
+    FelicitySolarAPI,
+    create_felicity_client_session,
+    normalize_device_snapshot,
+    is_device_online,
+    device_record_fingerprint,
+)
+from .const import (
+    DOMAIN,
+    DEVICE_DISCOVERY_INTERVAL,
+    MAX_BUDGET_UPDATE_INTERVAL,
+    BUDGET_ONE_OFF_RESERVE,
+    BANDWIDTH_STORAGE_VERSION,
+    BANDWIDTH_SAVE_DELAY,
+)
+from .scheduler import FelicitySolarScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def _safe_float(value, default=0.0):
-    """Convert value to float, returning default if value is None or invalid."""
-    try:
-        return float(value) if value is not None else default
-    except (ValueError, TypeError):
-        return default
-
-
-def _safe_int(value, default=0):
-    """Convert value to int, returning default if value is None or invalid."""
-    try:
-        return int(value) if value is not None else default
-    except (ValueError, TypeError):
-        return default
+def bandwidth_store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, BANDWIDTH_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.bandwidth")
 
 
 class FelicitySolarCoordinator(DataUpdateCoordinator):
     """Coordinator to fetch data from Felicity Solar."""
 
-    def __init__(self, hass: HomeAssistant, email: str, password: str, update_interval: int):
+    def __init__(self, hass: HomeAssistant, entry_id: str, scheduler: FelicitySolarScheduler,
+                 email: str, password: str, update_interval: int, timeouts: dict[str, float],
+                 hedge_snapshots: bool, cycle_deadline: int, bandwidth_saving: bool,
+                 daily_byte_budget: int, tiered_polling: bool, session_state: dict | None = None):
+        # Polling is driven by the shared scheduler rather than a timer per coordinator
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(seconds=update_interval),
+            update_interval=None,
         )
+        self.entry_id = entry_id
+        self.poll_interval = timedelta(seconds=update_interval)
+        self._base_poll_interval = self.poll_interval
+        self.cycle_deadline = cycle_deadline
+        self.bandwidth_saving = bandwidth_saving
+        self.daily_byte_budget = daily_byte_budget
+        self.tiered_polling = tiered_polling
+        self._scheduler = scheduler
         self._session = create_felicity_client_session(hass)
         self.api = FelicitySolarAPI(
             email=email,
             password=password,
-            session=self._session
+            session=self._session,
+            timeouts=timeouts,
+            hedge_snapshots=hedge_snapshots
         )
+        self._use_handed_over_session = session_state is not None
+        if session_state is not None:
+            self.api.restore_session(session_state)
+
+        self._last_discovery: float | None = None
+        # Device list fingerprint as of each device's last successful snapshot
+        self._snapshot_fingerprints: dict[str, str] = {}
+        self.bytes_used_today = 0
+        self._bytes_day = dt_util.now().date()
+        self._bytes_counted = 0
+        self._endpoint_bytes_counted = dict(self.api.bytes_by_endpoint)
+        # Average size of a steady-state cycle, leaving out one-off login and discovery traffic
+        self._avg_cycle_bytes: float | None = None
+        self._bandwidth_store = bandwidth_store(hass, entry_id)
+
+    async def async_load_bandwidth(self) -> None:
+        """Restore today's byte count saved before the last restart or reload."""
+        stored = await self._bandwidth_store.async_load()
+        if stored and stored.get("day") == self._bytes_day.isoformat():
+            self.bytes_used_today = stored.get("bytes", 0)
+            _LOGGER.info("Restored today's data usage: %d bytes", self.bytes_used_today)
+
+    async def async_save_bandwidth(self) -> None:
+        await self._bandwidth_store.async_save(self._bandwidth_data())
+
+    def _bandwidth_data(self) -> dict:
+        return {"day": self._bytes_day.isoformat(), "bytes": self.bytes_used_today}
 
     async def _async_update_data(self) -> dict[str, dict]:
         """Fetch data from API for all devices."""
         try:
+            # Budget spent: keep the last values until midnight. The first refresh still runs,
+            # otherwise a restart late in the day would come up without any entities
+            if self.data is not None and self._budget_spent():
+                _LOGGER.warning(
+                    "Daily byte budget of %d bytes spent (%d used), skipping update until midnight",
+                    self.daily_byte_budget, self.bytes_used_today
+                )
+                return self.data
+
             _LOGGER.info("Starting data update cycle")
 
             # Re-auth and load devices if needed
-            await self.api.initialize()
+            await self._async_prepare_session()
 
             devices_data = {}
             serial_numbers = self.api.get_devices_serial_numbers()
@@ -57,70 +112,53 @@ class FelicitySolarCoordinator(DataUpdateCoordinator):
                 _LOGGER.warning("No devices found — check your Felicity Solar account or credentials")
                 return devices_data
 
-            _LOGGER.info("Fetching snapshots for %d device(s)", len(serial_numbers))
-
+            previous_data = self.data or {}
+            to_fetch = [
+                device_sn for device_sn in serial_numbers
+                if self._needs_snapshot(device_sn, previous_data)
+            ]
             for device_sn in serial_numbers:
-                try:
-                    snapshot = await self.api.get_device_snapshot(device_sn)
-                    device_type = snapshot.get("productTypeEnum")
-
-                    if device_type == DeviceTypeEnum.HIGH_FREQUENCY_INVERTER:
-                        devices_data[device_sn] = {
-                            "type": device_type,
-                            "serialNumber": device_sn,
-                            "data": {
-                                "acInputVoltage": _safe_float(snapshot.get("acRInVolt")),
-                                "acInputFrequency": _safe_float(snapshot.get("acRInFreq")),
-                                "acInputPower": _safe_float(snapshot.get("acRInPower")),
-                                "acOutputVoltage": _safe_float(snapshot.get("acROutVolt")),
-                                "acOutputCurrent": _safe_float(snapshot.get("acROutCurr")),
-                                "acOutputFrequency": _safe_float(snapshot.get("acROutFreq")),
-                                "acTotalOutputActivePower": _safe_float(snapshot.get("acTotalOutActPower")),
-                                "loadPercentage": _safe_float(snapshot.get("loadPercent")),
-                                "pvVoltage": _safe_float(snapshot.get("pvVolt")),
-                                "pvInputCurrent": _safe_float(snapshot.get("pvInCurr")),
-                                "pvPower": _safe_float(snapshot.get("pvPower")),
-                                "pvTotalPower": _safe_float(snapshot.get("pvTotalPower")),
-                                "batteryVoltage": _safe_float(snapshot.get("emsVoltage")),
-                                "batteryCurrent": _safe_float(snapshot.get("emsCurrent")),
-                                "batteryPower": _safe_float(snapshot.get("emsPower")),
-                                "batterySoc": _safe_int(snapshot.get("emsSoc")),
-                                "tempMax": _safe_float(snapshot.get("tempMax")),
-                                "devTempMax": _safe_float(snapshot.get("devTempMax")),
-                                "energyPvToday": _safe_float(snapshot.get("ePvToday")),
-                                "energyPvTotal": _safe_float(snapshot.get("ePvTotal")),
-                                "energyLoadToday": _safe_float(snapshot.get("eLoadToday")),
-                                "energyLoadTotal": _safe_float(snapshot.get("eLoadTotal")),
-                                "totalEnergy": _safe_float(snapshot.get("totalEnergy")),
-                            }
-                        }
-                    elif device_type == DeviceTypeEnum.LITHIUM_BATTERY_PACK:
-                        devices_data[device_sn] = {
-                            "type": device_type,
-                            "serialNumber": device_sn,
-                            "data": {
-                                "voltage": _safe_float(snapshot.get("battVolt")),
-                                "current": _safe_float(snapshot.get("battCurr")),
-                                "soc": _safe_int(snapshot.get("battSoc")),
-                                "soh": _safe_int(snapshot.get("battSoh")),
-                                "ratedEnergy": _safe_float(snapshot.get("ratedEnergy")),
-                                "energyUnit": str(snapshot.get("energyUnit", "")),
-                                "nameplateRatedPower": str(snapshot.get("nameplateRatedPower", "")),
-                            }
-                        }
-                    else:
-                        _LOGGER.warning(
-                            "Unknown device type '%s' for %s, skipping",
-                            device_type, device_sn
-                        )
-                        continue
-
-                    _LOGGER.debug("Data fetched successfully for %s (%s)", device_sn, device_type)
-
-                except Exception as err:
-                    _LOGGER.error("Failed to fetch snapshot for device %s: %s", device_sn, err)
+                if device_sn not in to_fetch:
+                    devices_data[device_sn] = previous_data[device_sn]
+            if len(to_fetch) < len(serial_numbers):
+                _LOGGER.info(
+                    "Tiered polling: skipping %d offline device(s) with an unchanged device list entry",
+                    len(serial_numbers) - len(to_fetch)
+                )
+
+            _LOGGER.info("Fetching snapshots for %d device(s)", len(to_fetch))
+
+            tasks = {
+                device_sn: asyncio.create_task(self._async_fetch_device(device_sn))
+                for device_sn in to_fetch
+            }
+            # The deadline only covers the snapshots, and only once there are previous values
+            # to fall back on; the first refresh waits for every device (each request still
+            # has its own timeout) so setup doesn't complete without any devices
+            pending = set()
+            if tasks:
+                _, pending = await asyncio.wait(
+                    tasks.values(), timeout=self.cycle_deadline if previous_data else None
+                )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            for device_sn, task in tasks.items():
+                if task in pending:
+                    # Publish what we have instead of stalling every entity on one slow device
+                    _LOGGER.warning(
+                        "Snapshot for %s missed the %ds cycle deadline, keeping previous values",
+                        device_sn, self.cycle_deadline
+                    )
+                    if device_sn in previous_data:
+                        devices_data[device_sn] = previous_data[device_sn]
                     continue
 
+                device_entry = task.result()
+                if device_entry is not None:
+                    devices_data[device_sn] = device_entry
+
             _LOGGER.info(
                 "Data update complete: %d device(s) with data out of %d",
                 len(devices_data), len(serial_numbers)
@@ -130,3 +168,135 @@ class FelicitySolarCoordinator(DataUpdateCoordinator):
         except Exception as err:
             _LOGGER.error("Update failed: %s", err)
             raise UpdateFailed(f"Error communicating with API: {err}")
+        finally:
+            self._track_bandwidth()
+
+    async def _async_prepare_session(self) -> None:
+        """Make sure we're logged in and know the device list before fetching snapshots."""
+        now = self.hass.loop.time()
+        if self._use_handed_over_session and self.api.has_valid_session():
+            _LOGGER.info("Using the session validated by the config flow, skipping login and discovery")
+            self._use_handed_over_session = False
+            self._last_discovery = now
+            return
+        self._use_handed_over_session = False
+
+        # Tiered polling relies on a fresh device list every cycle
+        if (
+            self.bandwidth_saving
+            and not self.tiered_polling
+            and self._last_discovery is not None
+            and self.api.get_devices_serial_numbers()
+            and now - self._last_discovery < DEVICE_DISCOVERY_INTERVAL
+        ):
+            # Device list is recent enough, only log in again if the token expired
+            async with self._scheduler.slot(self.entry_id):
+                await self.api.ensure_logged_in()
+            return
+
+        async with self._scheduler.slot(self.entry_id):
+            await self.api.initialize()
+        self._last_discovery = now
+
+    def _needs_snapshot(self, device_sn: str, previous_data: dict) -> bool:
+        if not self.tiered_polling or device_sn not in previous_data:
+            return True
+        record = self.api.get_device_record(device_sn)
+        if record is None or is_device_online(record):
+            return True
+        # Offline device: its snapshot can only differ if its list entry did
+        return self._snapshot_fingerprints.get(device_sn) != device_record_fingerprint(record)
+
+    def _track_bandwidth(self) -> None:
+        cycle_bytes = self.api.bytes_used - self._bytes_counted
+        self._bytes_counted = self.api.bytes_used
+
+        self._roll_bandwidth_day()
+        self.bytes_used_today += cycle_bytes
+        self._bandwidth_store.async_delay_save(self._bandwidth_data, BANDWIDTH_SAVE_DELAY)
+
+        endpoint_bytes = {
+            endpoint: count - self._endpoint_bytes_counted[endpoint]
+            for endpoint, count in self.api.bytes_by_endpoint.items()
+        }
+        self._endpoint_bytes_counted = dict(self.api.bytes_by_endpoint)
+        _LOGGER.debug(
+            "Cycle used %d bytes (%s), %d bytes today",
+            cycle_bytes, endpoint_bytes, self.bytes_used_today
+        )
+
+        # Logins and the occasional rediscovery still count towards today's total, but
+        # only the traffic repeated every cycle decides how often we can afford to poll
+        steady_bytes = endpoint_bytes["snapshot"]
+        if self.tiered_polling:
+            steady_bytes += endpoint_bytes["device_list"]
+        if steady_bytes:
+            if self._avg_cycle_bytes is None:
+                self._avg_cycle_bytes = steady_bytes
+            else:
+                self._avg_cycle_bytes = 0.8 * self._avg_cycle_bytes + 0.2 * steady_bytes
+
+        if self.bandwidth_saving and self.daily_byte_budget and self._avg_cycle_bytes is not None:
+            self._fit_interval_to_budget()
+
+    def _roll_bandwidth_day(self) -> None:
+        today = dt_util.now().date()
+        if today != self._bytes_day:
+            self._bytes_day = today
+            self.bytes_used_today = 0
+
+    def _budget_spent(self) -> bool:
+        if not self.bandwidth_saving or not self.daily_byte_budget:
+            return False
+        self._roll_bandwidth_day()
+        return self.bytes_used_today >= self.daily_byte_budget
+
+    def _fit_interval_to_budget(self) -> None:
+        """Stretch the update interval so the average cycle fits in what's left of today's budget.
+
+        Pacing aims below the budget, leaving BUDGET_ONE_OFF_RESERVE of it for logins and
+        rediscovery, which aren't part of the average cycle.
+        """
+        now = dt_util.now()
+        seconds_left = (dt_util.start_of_local_day(now) + timedelta(days=1) - now).total_seconds()
+        paced_budget = self.daily_byte_budget * (1 - BUDGET_ONE_OFF_RESERVE)
+        bytes_left = paced_budget - self.bytes_used_today
+
+        if bytes_left <= 0:
+            seconds = MAX_BUDGET_UPDATE_INTERVAL
+        else:
+            seconds = self._avg_cycle_bytes * seconds_left / bytes_left
+        seconds = min(MAX_BUDGET_UPDATE_INTERVAL, max(self._base_poll_interval.total_seconds(), seconds))
+
+        interval = timedelta(seconds=round(seconds))
+        if interval != self.poll_interval:
+            _LOGGER.info(
+                "Daily byte budget: %d of %d bytes used, update interval now %d seconds",
+                self.bytes_used_today, self.daily_byte_budget, interval.total_seconds()
+            )
+            self.poll_interval = interval
+
+    async def _async_fetch_device(self, device_sn: str) -> dict | None:
+        try:
+            async with self._scheduler.slot(self.entry_id):
+                snapshot = await self.api.get_device_snapshot(device_sn, self._scheduler.try_acquire_slot)
+        except Exception as err:
+            _LOGGER.error("Failed to fetch snapshot for device %s: %s", device_sn, err)
+            return None
+
+        device_type = snapshot.get("productTypeEnum")
+        device_entry = normalize_device_snapshot(device_sn, snapshot)
+
+        if device_entry is None:
+            _LOGGER.warning(
+                "Unknown device type '%s' for %s, skipping",
+                device_type, device_sn
+            )
+            return None
+
+        record = self.api.get_device_record(device_sn)
+        if record is not None:
+            self._snapshot_fingerprints[device_sn] = device_record_fingerprint(record)
+
+        _LOGGER.debug("Data fetched successfully for %s (%s)", device_sn, device_type)
+        return device_entry
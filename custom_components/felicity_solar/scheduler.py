@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Callable
+
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE
+from homeassistant.helpers.event import async_call_later
+
+from .const import SCHEDULER_MAX_IN_FLIGHT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FelicitySolarScheduler:
+    """Domain-wide scheduler shared by every Felicity Solar config entry.
+
+    Coordinators don't run their own timers: the scheduler triggers each one at a
+    phase offset so accounts are spread over the interval, and every API request
+    goes through slot(), which caps the number of in-flight requests across all
+    entries and hands free slots out round-robin between entries.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_in_flight: int = SCHEDULER_MAX_IN_FLIGHT):
+        self.hass = hass
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {}
+        self._ready: deque[str] = deque()
+
+        self._coordinators: dict = {}
+        self._next_run: dict[str, float] = {}
+        self._timers: dict[str, CALLBACK_TYPE] = {}
+        self._refreshing: set[str] = set()
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._coordinators
+
+    def async_register(self, entry_id: str, coordinator) -> None:
+        """Start polling a coordinator and re-spread the phases of all entries."""
+        self._coordinators[entry_id] = coordinator
+        _LOGGER.info("Registered entry %s with scheduler (%d entries)", entry_id, len(self._coordinators))
+        self._rebalance()
+
+    def async_unregister(self, entry_id: str) -> None:
+        self._coordinators.pop(entry_id, None)
+        self._next_run.pop(entry_id, None)
+        cancel = self._timers.pop(entry_id, None)
+        if cancel:
+            cancel()
+        _LOGGER.info("Unregistered entry %s from scheduler (%d entries left)", entry_id, len(self._coordinators))
+        self._rebalance()
+
+    @asynccontextmanager
+    async def slot(self, entry_id: str) -> AsyncIterator[None]:
+        """Hold one of the global in-flight request slots for the duration of a request."""
+        await self._acquire(entry_id)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def try_acquire_slot(self) -> Callable[[], None] | None:
+        """Take a slot only if one is free right now, returning its release callback.
+
+        Used for optional extra requests (hedges) that must not queue up or exceed the cap.
+        """
+        if self._in_flight >= self._max_in_flight or any(
+            not future.done() for waiters in self._waiters.values() for future in waiters
+        ):
+            return None
+        self._in_flight += 1
+        return self._release
+
+    # --- Private Methods ---
+
+    def _rebalance(self) -> None:
+        # The most recently registered entry has just done its first refresh, so it
+        # goes last; the others are spread evenly over the interval ahead of it
+        now = self.hass.loop.time()
+        count = len(self._coordinators)
+        for index, entry_id in enumerate(self._coordinators):
+            interval = self._coordinators[entry_id].poll_interval.total_seconds()
+            self._schedule(entry_id, now + interval * (index + 1) / count)
+
+    def _schedule(self, entry_id: str, when: float) -> None:
+        cancel = self._timers.pop(entry_id, None)
+        if cancel:
+            cancel()
+        self._next_run[entry_id] = when
+        delay = max(0.0, when - self.hass.loop.time())
+        self._timers[entry_id] = async_call_later(self.hass, delay, partial(self._async_fire, entry_id))
+
+    async def _async_fire(self, entry_id: str, _now) -> None:
+        coordinator = self._coordinators.get(entry_id)
+        if coordinator is None:
+            return
+        self._timers.pop(entry_id, None)
+
+        # Fixed-rate schedule so the phase offsets don't drift with cycle durations
+        interval = coordinator.poll_interval.total_seconds()
+        now = self.hass.loop.time()
+        next_run = self._next_run[entry_id] + interval
+        if next_run <= now:
+            next_run = now + interval
+        self._schedule(entry_id, next_run)
+
+        if entry_id in self._refreshing:
+            _LOGGER.warning("Previous update for entry %s still running, skipping this cycle", entry_id)
+            return
+
+        self._refreshing.add(entry_id)
+        try:
+            await coordinator.async_refresh()
+        finally:
+            self._refreshing.discard(entry_id)
+
+    async def _acquire(self, entry_id: str) -> None:
+        future = self.hass.loop.create_future()
+        self._waiters.setdefault(entry_id, deque()).append(future)
+        if entry_id not in self._ready:
+            self._ready.append(entry_id)
+        self._wake_next()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we got cancelled, pass it on
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake_next()
+
+    def _wake_next(self) -> None:
+        while self._in_flight < self._max_in_flight and self._ready:
+            entry_id = self._ready.popleft()
+            waiters = self._waiters.get(entry_id)
+            while waiters and waiters[0].done():
+                waiters.popleft()
+            if not waiters:
+                self._waiters.pop(entry_id, None)
+                continue
+
+            future = waiters.popleft()
+            # Round-robin: an entry with more queued requests goes to the back of the line
+            if waiters:
+                self._ready.append(entry_id)
+            else:
+                self._waiters.pop(entry_id, None)
+
+            self._in_flight += 1
+            future.set_result(None)
@@ -5,6 +5,7 @@ from .const import DOMAIN
 from .api import DeviceTypeEnum
 from .sensors_inverter import create_inverter_sensors
 from .sensors_battery import create_battery_sensors
+from .sensors_account import create_account_sensors
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,7 +14,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
     """Set up the sensor platform dynamically based on discovered devices."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
 
-    entities = []
+    entities = create_account_sensors(coordinator, entry.entry_id)
 
     # coordinator.data is the dictionary mapped by device serial number we built in _async_update_data
     if coordinator.data:
@@ -0,0 +1,37 @@
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorDeviceClass,
+    SensorStateClass,
+)
+from homeassistant.const import UnitOfInformation
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+# Per-account values that live on the coordinator rather than on a device snapshot
+ACCOUNT_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    # Resets at midnight, which TOTAL_INCREASING treats as a new cycle
+    SensorEntityDescription(key="bytes_used_today", name="Data Used Today", native_unit_of_measurement=UnitOfInformation.BYTES,
+                            device_class=SensorDeviceClass.DATA_SIZE, state_class=SensorStateClass.TOTAL_INCREASING),
+)
+
+
+def create_account_sensors(coordinator, entry_id):
+    return [FelicityAccountSensor(coordinator, entry_id, desc) for desc in ACCOUNT_DESCRIPTIONS]
+
+
+class FelicityAccountSensor(CoordinatorEntity, SensorEntity):
+    def __init__(self, coordinator, entry_id: str, description: SensorEntityDescription):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{entry_id}_{description.key}"
+        self._attr_device_info = {
+            "identifiers": {("felicity_solar", entry_id)},
+            "name": f"Felicity Solar Account {coordinator.api.email}",
+            "manufacturer": "Felicity Solar",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    @property
+    def native_value(self):
+        return getattr(self.coordinator, self.entity_description.key)
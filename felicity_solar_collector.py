@@ -0,0 +1,24 @@
+"""Entry point for the standalone Felicity Solar collector.
+
+The integration package's __init__ imports Home Assistant, so rather than importing
+custom_components.felicity_solar this registers the package directory under a bare
+module name and loads only the Home Assistant-free modules (api, const, collector).
+
+Usage:
+    python felicity_solar_collector.py --config accounts.json
+"""
+import os
+import sys
+import types
+
+PACKAGE_NAME = "felicity_solar"
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_components", PACKAGE_NAME)
+
+package = types.ModuleType(PACKAGE_NAME)
+package.__path__ = [PACKAGE_DIR]
+sys.modules[PACKAGE_NAME] = package
+
+from felicity_solar.collector import main  # noqa: E402
+
+if __name__ == "__main__":
+    main()